@@ -4,11 +4,14 @@ import asyncio
 import json
 import logging
 import os
-import tempfile
+import re
+from collections import OrderedDict
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Awaitable, Dict, Optional, Tuple, TypeVar
 
-from telegram import Update, BotCommand, InlineKeyboardMarkup, InlineKeyboardButton
+import orjson
+from telegram import Update, BotCommand, InlineKeyboardMarkup, InlineKeyboardButton, InputFile
 from telegram.ext import (
     AIORateLimiter,
     Application,
@@ -21,13 +24,15 @@ from telegram.ext import (
 
 from .config import Settings, load_settings
 from .shell_session import ShellSession
-from .utils import CodeBlock, chunk_text, extract_code_block, redact_env_value
-from .tmux_bridge import TmuxBridge, _increment
+from .utils import CodeBlock, extract_code_block
+from .tmux_bridge import TmuxBridge, TmuxResult, _increment, close_control_clients
 from .projects import ProjectsManager, slugify
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 WELCOME = (
     "Welcome to DevGram!\n\n"
@@ -46,6 +51,92 @@ WELCOME = (
 )
 
 
+_BOT_COMMANDS = [
+    BotCommand("start", "Welcome"),
+    BotCommand("help", "Help"),
+    BotCommand("mode", "shell | term"),
+    BotCommand("status", "Show mode/cwd/term"),
+    BotCommand("proj", "List projects"),
+    BotCommand("new", "Create project"),
+    BotCommand("open", "Open project"),
+    BotCommand("rm", "Remove project"),
+    BotCommand("sh", "Run shell"),
+    BotCommand("cwd", "Show working dir"),
+    BotCommand("env", "Show env"),
+    BotCommand("reset", "Reset session"),
+    BotCommand("term_status", "Term status"),
+    BotCommand("term_send", "Send to term"),
+    BotCommand("term_capture", "Capture term tail"),
+]
+
+
+# Leading "/command" or "/command@BotName" of a command message
+_COMMAND_RE = re.compile(r"/\w+(?:@\w+)?")
+
+
+def _command_text(text: str) -> str:
+    m = _COMMAND_RE.match(text)
+    return (text[m.end():] if m else text).strip()
+
+
+async def _swallow(aw: Awaitable[T]) -> Optional[T]:
+    """Await a best-effort Telegram call; log failures at debug level and return None."""
+    try:
+        return await aw
+    except Exception:
+        logger.debug("Ignored error from best-effort call", exc_info=True)
+        return None
+
+
+SESSION_FLUSH_DELAY = 0.25
+STARTUP_SETTLE_SECONDS = 0.3
+SESSION_CACHE_SIZE = 512
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_session_file(path: Path) -> Optional[Tuple[bytes, int]]:
+    try:
+        with path.open("rb") as f:
+            return f.read(), os.fstat(f.fileno()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _write_session_file(path: Path, payload: bytes) -> int:
+    # Write to a sibling temp file and swap it in so a crash never leaves a torn file
+    tmp = path.with_suffix(".json.tmp")
+    try:
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path.stat().st_mtime_ns
+
+
+def _dump_session(data: dict) -> bytes:
+    try:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    except TypeError:
+        # orjson rejects lone surrogates, which os.environ uses for non-UTF-8 bytes;
+        # json escapes them as \udcXX instead
+        return json.dumps(data, indent=2).encode()
+
+
+def _load_session(raw: bytes) -> dict:
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        # Files written by the json fallback above may hold escaped lone surrogates
+        return json.loads(raw)
+
+
 class Session:
     def __init__(self, chat_id: int, settings: Settings):
         self.chat_id = chat_id
@@ -55,11 +146,15 @@ class Session:
         # term mode state
         self.term_target: Optional[str] = None
         self.term_snapshot: str = ""
+        # Last payload written to (or read from) disk and its mtime
+        self._last_payload: Optional[bytes] = None
+        self._mtime: Optional[int] = None
 
     def to_json(self) -> dict:
         return {
             "mode": self.mode,
             "cwd": str(self.shell.cwd),
+            "workspace_root": str(self.shell.workspace_root),
             "env": self.shell.env,
             "term_target": self.term_target,
             "term_snapshot": self.term_snapshot,
@@ -69,8 +164,14 @@ class Session:
     def from_json(cls, chat_id: int, settings: Settings, data: dict) -> "Session":
         s = cls(chat_id, settings)
         s.mode = data.get("mode", "shell")
-        cwd = Path(data.get("cwd", str(settings.workspace_dir)))
-        s.shell.cwd = cwd if cwd.exists() else settings.workspace_dir
+        # A project binding clamps the shell to the project dir; keep that across reloads
+        root = Path(data.get("workspace_root") or settings.workspace_dir)
+        if root != settings.workspace_dir and not root.is_dir():
+            root = settings.workspace_dir
+        s.shell.workspace_root = root
+        cwd = Path(data.get("cwd", str(root)))
+        # The workspace root is known to exist; skip the stat for the common case
+        s.shell.cwd = cwd if cwd == root or cwd.exists() else root
         env = data.get("env") or {}
         if isinstance(env, dict):
             s.shell.env = {str(k): str(v) for k, v in env.items()}
@@ -82,7 +183,14 @@ class Session:
 class BotApp:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.sessions: Dict[int, Session] = {}
+        # Bounded LRU of loaded sessions; least recently used first
+        self.sessions: OrderedDict[int, Session] = OrderedDict()
+        self._dirty: set[int] = set()
+        # Chats whose save is on its way to disk; their file may be newer than _mtime.
+        # One write per chat at a time, so an older payload can never land last
+        self._writing: set[int] = set()
+        self._write_done = asyncio.Condition()
+        self._flush_task: Optional[asyncio.Task] = None
 
         self._sessions_dir = settings.data_dir / "sessions"
         self._sessions_dir.mkdir(parents=True, exist_ok=True)
@@ -90,6 +198,13 @@ class BotApp:
 
         # Per-tmux-target locks to serialize access and avoid interleaving
         self._tmux_locks: Dict[str, asyncio.Lock] = {}
+        # Per-target count of sends; lets a waiter notice that someone typed after it
+        self._term_seq: Dict[str, int] = {}
+        # Reverse index of chats bound to each tmux target
+        self._target_to_chats: Dict[str, set[int]] = {}
+
+        # Bot username for deep links; filled in at startup
+        self._me_username: Optional[str] = None
 
         # Projects manager
         self.projects = ProjectsManager(settings.projects_dir, codex_cmd=settings.tmux_codex_cmd)
@@ -97,66 +212,128 @@ class BotApp:
     def _session_path(self, chat_id: int) -> Path:
         return self._sessions_dir / f"{chat_id}.json"
 
-    def get_session(self, chat_id: int) -> Session:
-        if chat_id in self.sessions:
-            return self.sessions[chat_id]
+    async def get_session(self, chat_id: int) -> Session:
         path = self._session_path(chat_id)
-        if path.exists():
-            try:
-                data = json.loads(path.read_text())
-                sess = Session.from_json(chat_id, self.settings, data)
-                self.sessions[chat_id] = sess
-                return sess
-            except Exception:
-                logger.exception("Failed to load session for chat %s", chat_id)
-        sess = Session(chat_id, self.settings)
+        cached = self.sessions.get(chat_id)
+        if cached is not None and (self._has_unsaved(chat_id) or _mtime_ns(path) == cached._mtime):
+            self.sessions.move_to_end(chat_id)
+            return cached
+        sess = None
+        try:
+            loaded = await asyncio.to_thread(_read_session_file, path)
+            if loaded is not None:
+                raw, mtime = loaded
+                if cached is not None and raw == cached._last_payload:
+                    sess = cached
+                else:
+                    sess = Session.from_json(chat_id, self.settings, _load_session(raw))
+                    sess._last_payload = raw
+                sess._mtime = mtime
+        except Exception:
+            logger.exception("Failed to load session for chat %s", chat_id)
+        # A save may have started while we were reading; memory is still authoritative
+        if sess is None or (cached is not None and self._has_unsaved(chat_id)):
+            sess = cached or Session(chat_id, self.settings)
+        # Another handler may have loaded the same chat while we were reading
+        current = self.sessions.get(chat_id)
+        if current is not None and current is not cached:
+            sess = current
         self.sessions[chat_id] = sess
+        self.sessions.move_to_end(chat_id)
+        if sess is not cached:
+            self._index_term_target(chat_id, cached.term_target if cached else None, sess.term_target)
+            if cached is not None:
+                await cached.shell.aclose()
+        await self._evict_sessions()
         return sess
 
-    def save_session(self, chat_id: int) -> None:
-        sess = self.sessions.get(chat_id)
-        if not sess:
+    def _has_unsaved(self, chat_id: int) -> bool:
+        return chat_id in self._dirty or chat_id in self._writing
+
+    async def _evict_sessions(self) -> None:
+        while len(self.sessions) > SESSION_CACHE_SIZE:
+            chat_id, sess = self.sessions.popitem(last=False)
+            await sess.shell.aclose()
+            if chat_id in self._dirty:
+                self._dirty.discard(chat_id)
+                await self._write_session(chat_id, sess)
+
+    async def save_session(self, chat_id: int) -> None:
+        if chat_id not in self.sessions:
             return
+        # Coalesce bursts of saves into a single write per chat
+        self._dirty.add(chat_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(SESSION_FLUSH_DELAY)
+            await self.flush_sessions()
+
+    async def flush_sessions(self) -> None:
+        dirty, self._dirty = self._dirty, set()
+        for chat_id in dirty:
+            sess = self.sessions.get(chat_id)
+            if sess is not None:
+                await self._write_session(chat_id, sess)
+
+    async def _write_session(self, chat_id: int, sess: Session) -> None:
         path = self._session_path(chat_id)
+        async with self._write_done:
+            await self._write_done.wait_for(lambda: chat_id not in self._writing)
+            self._writing.add(chat_id)
         try:
-            path.write_text(json.dumps(sess.to_json(), indent=2))
+            # Encoded only once any earlier write has finished, so this is the latest state
+            payload = _dump_session(sess.to_json())
+            if payload != sess._last_payload:
+                sess._mtime = await asyncio.to_thread(_write_session_file, path, payload)
+                sess._last_payload = payload
         except Exception:
             logger.exception("Failed to save session %s", chat_id)
+        finally:
+            async with self._write_done:
+                self._writing.discard(chat_id)
+                self._write_done.notify_all()
+
+    async def shutdown(self) -> None:
+        """Finish pending saves and stop every chat's shell and tmux control client."""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush_sessions()
+        await asyncio.gather(*(sess.shell.aclose() for sess in self.sessions.values()))
+        await close_control_clients()
+
+    def _index_term_target(self, chat_id: int, old: Optional[str], new: Optional[str]) -> None:
+        if old and old != new:
+            chats = self._target_to_chats.get(old)
+            if chats is not None:
+                chats.discard(chat_id)
+                if not chats:
+                    del self._target_to_chats[old]
+        if new:
+            self._target_to_chats.setdefault(new, set()).add(chat_id)
+
+    def _set_term_target(self, sess: Session, target: Optional[str]) -> None:
+        self._index_term_target(sess.chat_id, sess.term_target, target)
+        sess.term_target = target
 
     def _get_tmux_lock(self, target: str) -> asyncio.Lock:
-        lock = self._tmux_locks.get(target)
-        if lock is None:
-            lock = asyncio.Lock()
-            self._tmux_locks[target] = lock
-        return lock
+        return self._tmux_locks.setdefault(target, asyncio.Lock())
 
     def authorized(self, user_id: Optional[int]) -> bool:
-        return bool(user_id) and (int(user_id) in self.settings.allowed_user_ids)
+        return user_id is not None and user_id in self.settings.allowed_user_ids
 
     async def _send_long_text(self, update: Update, text: str, filename_hint: str = "output.txt") -> None:
         if len(text) <= self.settings.max_output_chars:
-            for chunk in chunk_text(text, limit=self.settings.max_output_chars):
-                await update.effective_chat.send_message(chunk)
+            # Fits in one message; anything longer goes out as a single document below
+            await update.effective_chat.send_message(text)
             return
         # Send as a file if too long
-        tmp = tempfile.NamedTemporaryFile("w+", suffix=filename_hint, delete=False)
-        try:
-            tmp.write(text)
-            tmp.flush()
-            tmp.close()
-            await update.effective_chat.send_document(tmp.name)
-        finally:
-            try:
-                os.unlink(tmp.name)
-            except Exception:
-                pass
+        buf = BytesIO(text.encode())
+        await update.effective_chat.send_document(document=InputFile(buf, filename=filename_hint))
 
     async def handle_start(self, update: Update, context: CallbackContext) -> None:
-        # Ensure commands are visible in the Telegram composer
-        try:
-            await context.bot.set_my_commands(build_bot_commands())
-        except Exception:
-            pass
         # Bind to project via deep-link start parameter: p_<slug>
         if context.args:
             param = (context.args[0] or "").strip()
@@ -168,14 +345,14 @@ class BotApp:
                 if not self.projects.exists(slug):
                     await update.message.reply_text("Project not found. Use /proj to list.")
                     return
-                sess = self.get_session(update.effective_chat.id)
+                sess = await self.get_session(update.effective_chat.id)
                 proj_path = self.settings.projects_dir / slug
                 sess.shell.cwd = proj_path
                 # Clamp workspace to the project dir for safety
                 sess.shell.workspace_root = proj_path
-                sess.term_target = self.projects.target_for(slug)
+                self._set_term_target(sess, self.projects.target_for(slug))
                 sess.mode = "term"
-                self.save_session(update.effective_chat.id)
+                await self.save_session(update.effective_chat.id)
                 await update.message.reply_text(f"Bound to project '{slug}'. Mode set to term; cwd={proj_path}")
                 return
         await update.message.reply_text(WELCOME)
@@ -186,8 +363,13 @@ class BotApp:
     def _deep_link(self, username: str, slug: str) -> str:
         return f"https://t.me/{username}?start=p_{slug}"
 
+    async def _bot_username(self, context: CallbackContext) -> str:
+        if self._me_username is None:
+            self._me_username = (await context.bot.get_me()).username
+        return self._me_username
+
     async def handle_mode(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         if not context.args:
             await update.message.reply_text(f"Current mode: {sess.mode}")
             return
@@ -196,15 +378,11 @@ class BotApp:
             await update.message.reply_text("Usage: /mode shell|term")
             return
         sess.mode = mode
-        self.save_session(update.effective_chat.id)
+        await self.save_session(update.effective_chat.id)
         await update.message.reply_text(f"Mode set to: {mode}")
 
     async def handle_newproject(self, update: Update, context: CallbackContext) -> None:
-        name = (update.message.text or "").strip()
-        if name.startswith("/newproject"):
-            name = name[len("/newproject"):].strip()
-        elif name.startswith("/new"):
-            name = name[len("/new"):].strip()
+        name = _command_text(update.message.text or "")
         # Allow quoted name or bare words
         if name.startswith("\"") and name.endswith("\"") and len(name) >= 2:
             name = name[1:-1]
@@ -217,8 +395,7 @@ class BotApp:
             await update.message.reply_text(f"Create failed: {e}")
             return
         # Build deep link
-        me = await context.bot.get_me()
-        link = self._deep_link(me.username, proj.slug)
+        link = self._deep_link(await self._bot_username(context), proj.slug)
         await update.message.reply_text(
             f"Created project '{proj.slug}' at {proj.path}\n"
             f"tmux session: {proj.session}\n"
@@ -230,13 +407,19 @@ class BotApp:
             bridge = TmuxBridge(target, capture_lines=self.settings.tmux_capture_lines)
             async with self._get_tmux_lock(target):
                 # Wait briefly for startup output to render, then capture until stable
+                # Poll with growing delays (~2s worst case); stop once unchanged for a short window
                 last = await bridge.capture()
-                for _ in range(4):
-                    await asyncio.sleep(0.5)
+                delay, settled = 0.05, 0.0
+                for _ in range(8):
+                    await asyncio.sleep(delay)
                     cur = await bridge.capture()
-                    if cur == last:
-                        break
-                    last = cur
+                    if cur != last:
+                        last, settled = cur, 0.0
+                    else:
+                        settled += delay
+                        if settled >= STARTUP_SETTLE_SECONDS:
+                            break
+                    delay = min(delay * 1.7, 0.4)
             text = last.strip()
             if text:
                 await self._send_long_text(update, text + "\n", filename_hint="newproject.txt")
@@ -244,14 +427,14 @@ class BotApp:
             pass
 
     async def handle_projects(self, update: Update, context: CallbackContext) -> None:
-        me = await context.bot.get_me()
+        username = await self._bot_username(context)
         items = self.projects.list()
         if not items:
             await update.message.reply_text("No projects. Create one with /new \"Name\".")
             return
         lines = []
         for p in items:
-            lines.append(f"- {p.slug}  ({p.path})  [{self._deep_link(me.username, p.slug)}]")
+            lines.append(f"- {p.slug}  ({p.path})  [{self._deep_link(username, p.slug)}]")
         await self._send_long_text(update, "\n".join(lines) + "\n", filename_hint="projects.txt")
 
     async def handle_bindproject(self, update: Update, context: CallbackContext) -> None:
@@ -262,13 +445,13 @@ class BotApp:
         if not self.projects.exists(slug):
             await update.message.reply_text("Project not found. Use /proj.")
             return
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         proj_path = self.settings.projects_dir / slug
         sess.shell.cwd = proj_path
         sess.shell.workspace_root = proj_path
-        sess.term_target = self.projects.target_for(slug)
+        self._set_term_target(sess, self.projects.target_for(slug))
         sess.mode = "term"
-        self.save_session(update.effective_chat.id)
+        await self.save_session(update.effective_chat.id)
         await update.message.reply_text(f"Bound to project '{slug}'. Mode set to term; cwd={proj_path}")
 
     async def handle_rm_request(self, update: Update, context: CallbackContext) -> None:
@@ -300,13 +483,16 @@ class BotApp:
         ok, msg = await self.projects.delete(slug)
         if ok:
             target = self.projects.target_for(slug)
-            for s in list(self.sessions.values()):
+            self._tmux_locks.pop(target, None)
+            self._term_seq.pop(target, None)
+            for chat_id in self._target_to_chats.pop(target, set()):
+                s = await self.get_session(chat_id)
                 if s.term_target == target:
-                    s.term_target = None
+                    self._set_term_target(s, None)
                     s.mode = "shell"
                     s.shell.workspace_root = self.settings.workspace_dir
                     s.shell.cwd = self.settings.workspace_dir
-                    self.save_session(s.chat_id)
+                    await self.save_session(s.chat_id)
         return ok, msg
 
     async def handle_rm_callback(self, update: Update, context: CallbackContext) -> None:
@@ -340,7 +526,7 @@ class BotApp:
                     await chat.send_message("Deletion cancelled.")
 
     async def handle_status(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         text = (
             f"mode: {sess.mode}\n"
             f"cwd: {sess.shell.cwd}\n"
@@ -359,14 +545,11 @@ class BotApp:
             text += ("\n" if text else "") + err
         prefix = "" if rc == 0 else f"[exit {rc}]\n"
         await self._send_long_text(update, prefix + (text or "(no output)\n"), filename_hint="shell.txt")
-        self.save_session(update.effective_chat.id)
+        await self.save_session(update.effective_chat.id)
 
     async def handle_shell(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
-        text = update.message.text or ""
-        # Strip command name if present
-        if text.startswith("/sh"):
-            text = text[len("/sh"):].strip()
+        sess = await self.get_session(update.effective_chat.id)
+        text = _command_text(update.message.text or "")
         if not text:
             await update.message.reply_text("Usage: /sh <command>")
             return
@@ -375,24 +558,23 @@ class BotApp:
     # Python mode removed
 
     async def handle_cwd(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         await update.message.reply_text(str(sess.shell.cwd))
 
     async def handle_env(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
-        pairs = [f"{k}={redact_env_value(k, v)}" for k, v in sorted(sess.shell.env.items())]
-        await self._send_long_text(update, "\n".join(pairs) + "\n", filename_hint="env.txt")
+        sess = await self.get_session(update.effective_chat.id)
+        await self._send_long_text(update, sess.shell.redacted_env() + "\n", filename_hint="env.txt")
 
     async def handle_reset(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         sess.shell.reset()
-        self.save_session(update.effective_chat.id)
+        await self.save_session(update.effective_chat.id)
         await update.message.reply_text("Session reset.")
 
     # Login/admin features removed
 
     async def handle_text(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         text = update.message.text or ""
 
         # Code block routing
@@ -428,20 +610,20 @@ class BotApp:
             await update.message.reply_text("tmux is not available on host.")
             return
         bridge = TmuxBridge(target, capture_lines=self.settings.tmux_capture_lines)
+        # Send an immediate acknowledgement to indicate progress
+        ack_msg = await _swallow(update.effective_chat.send_message("Working..."))
         try:
+            # Only the send is serialized; waiting for the pane to settle happens unlocked
             async with self._get_tmux_lock(target):
-                # Send an immediate acknowledgement to indicate progress
-                ack_msg = None
-                try:
-                    ack_msg = await update.effective_chat.send_message("Working...")
-                except Exception:
-                    ack_msg = None
-
-                result = await bridge.send_and_wait_idle(
-                    text,
-                    prev_snapshot=sess.term_snapshot,
-                    timeout_seconds=max(self.settings.tmux_timeout_seconds, 30),
-                )
+                prev_snapshot = await bridge.send(text, prev_snapshot=sess.term_snapshot)
+                seq = self._term_seq[target] = self._term_seq.get(target, 0) + 1
+            result = await bridge.wait_idle(
+                prev_snapshot,
+                timeout_seconds=max(self.settings.tmux_timeout_seconds, 30),
+            )
+            if self._term_seq.get(target) != seq:
+                # Another send landed while we waited; store a snapshot that includes it
+                result = TmuxResult(snapshot=await bridge.capture(), increment=result.increment)
         except Exception as e:
             await update.message.reply_text(f"tmux error: {e}")
             return
@@ -459,31 +641,26 @@ class BotApp:
                 await self._send_long_text(update, final_text + "\n", filename_hint="term.txt")
         else:
             # Too long to fit in a single message; edit ack and send as file
-            try:
-                if ack_msg is not None:
-                    await ack_msg.edit_text("Done. Output attached.")
-            except Exception:
-                pass
+            if ack_msg is not None:
+                await _swallow(ack_msg.edit_text("Done. Output attached."))
             await self._send_long_text(update, final_text + "\n", filename_hint="term.txt")
-        self.save_session(update.effective_chat.id)
+        await self.save_session(update.effective_chat.id)
 
     async def handle_term_status(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         target = sess.term_target
         await update.message.reply_text(f"term target: {target or '(unset)'}; capture_lines={self.settings.tmux_capture_lines}")
 
     async def handle_term_send(self, update: Update, context: CallbackContext) -> None:
-        text = (update.message.text or "").strip()
-        if text.startswith("/term_send"):
-            text = text[len("/term_send"):].strip()
+        text = _command_text(update.message.text or "")
         if not text:
             await update.message.reply_text("Usage: /term_send <text>")
             return
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         await self._run_term(update, sess, text)
 
     async def handle_term_capture(self, update: Update, context: CallbackContext) -> None:
-        sess = self.get_session(update.effective_chat.id)
+        sess = await self.get_session(update.effective_chat.id)
         target = sess.term_target
         if not target:
             await update.message.reply_text("No tmux target bound. Use /open <slug> or the deep link from /new.")
@@ -514,27 +691,19 @@ def require_auth(app: BotApp):
 
 
 def build_bot_commands() -> list[BotCommand]:
-    return [
-        BotCommand("start", "Welcome"),
-        BotCommand("help", "Help"),
-        BotCommand("mode", "shell | term"),
-        BotCommand("status", "Show mode/cwd/term"),
-        BotCommand("proj", "List projects"),
-        BotCommand("new", "Create project"),
-        BotCommand("open", "Open project"),
-        BotCommand("rm", "Remove project"),
-        BotCommand("sh", "Run shell"),
-        BotCommand("cwd", "Show working dir"),
-        BotCommand("env", "Show env"),
-        BotCommand("reset", "Reset session"),
-        BotCommand("term_status", "Term status"),
-        BotCommand("term_send", "Send to term"),
-        BotCommand("term_capture", "Capture term tail"),
-    ]
+    return _BOT_COMMANDS
 
 
 def main() -> None:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Use uvloop's faster event loop when it is installed
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     settings = load_settings()
     app_state = BotApp(settings)
 
@@ -548,12 +717,19 @@ def main() -> None:
         )
 
     async def _post_init(app: Application):
-        try:
-            await app.bot.set_my_commands(build_bot_commands())
-        except Exception:
-            pass
-
-    builder = ApplicationBuilder().token(settings.telegram_bot_token).post_init(_post_init)
+        await _swallow(app.bot.set_my_commands(build_bot_commands()))
+        # Application.initialize() has already fetched the bot's own user
+        app_state._me_username = app.bot.username
+
+    async def _post_shutdown(app: Application):
+        await app_state.shutdown()
+
+    builder = (
+        ApplicationBuilder()
+        .token(settings.telegram_bot_token)
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+    )
     if limiter is not None:
         builder = builder.rate_limiter(limiter)
     application: Application = builder.build()
@@ -1,14 +1,14 @@
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Set
+from typing import FrozenSet, Optional, Set
 
 from dotenv import load_dotenv
 
 
-def _parse_allowed_users(raw: Optional[str]) -> Set[int]:
+def _parse_allowed_users(raw: Optional[str]) -> FrozenSet[int]:
     if not raw:
-        return set()
+        return frozenset()
     result: Set[int] = set()
     for part in raw.split(","):
         part = part.strip()
@@ -18,13 +18,13 @@ def _parse_allowed_users(raw: Optional[str]) -> Set[int]:
             result.add(int(part))
         except ValueError:
             pass
-    return result
+    return frozenset(result)
 
 
 @dataclass
 class Settings:
     telegram_bot_token: str
-    allowed_user_ids: Set[int]
+    allowed_user_ids: FrozenSet[int]
     workspace_dir: Path
     projects_dir: Path
 
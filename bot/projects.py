@@ -2,20 +2,26 @@ from __future__ import annotations
 
 import asyncio
 import re
+import shlex
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Tuple
 
-from .tmux_bridge import _run_tmux, TmuxBridge
+from .tmux_bridge import _drop_control_client, _run_tmux
 
 
 _SLUG_RE = re.compile(r"[^a-z0-9]+")
+# ASCII characters outside [a-z0-9] become spaces, so split() collapses and trims the runs
+_SLUG_TABLE = str.maketrans({c: " " for c in map(chr, range(128)) if not ("a" <= c <= "z" or "0" <= c <= "9")})
 
 
 def slugify(name: str) -> str:
     s = name.strip().lower()
-    s = _SLUG_RE.sub("-", s).strip("-")
+    if s.isascii():
+        s = "-".join(s.translate(_SLUG_TABLE).split())
+    else:
+        s = _SLUG_RE.sub("-", s).strip("-")
     return s or "project"
 
 
@@ -65,7 +71,26 @@ class ProjectsManager:
         proj_path = self.path_for(slug)
         proj_path.mkdir(parents=True, exist_ok=False)
         session = self._session_name(slug)
-        # Create local Python venv (.venv)
+        # Create the venv and the tmux session concurrently. The pane blocks on a tmux
+        # wait-for channel until the venv exists, then activates it and starts the agent,
+        # so no keys race the shell's startup
+        channel = f"{session}-venv"
+        _, (rc, _, err) = await asyncio.gather(
+            self._make_venv(proj_path),
+            _run_tmux(
+                "new-session", "-d", "-s", session, "-c", str(proj_path), self._startup_command(channel),
+                timeout=10,
+            ),
+        )
+        if rc != 0:
+            # Cleanup created dir
+            shutil.rmtree(proj_path, ignore_errors=True)
+            raise RuntimeError(f"tmux new-session failed: {err.strip() or rc}")
+        await _run_tmux("wait-for", "-S", channel, timeout=5)
+        return Project(slug=slug, path=proj_path, session=session)
+
+    async def _make_venv(self, proj_path: Path) -> None:
+        # Create local Python venv (.venv); failures are ignored
         try:
             proc = await asyncio.create_subprocess_exec(
                 "python3", "-m", "venv", ".venv",
@@ -76,22 +101,20 @@ class ProjectsManager:
             await proc.communicate()
         except Exception:
             pass
-        # Create tmux session in project dir
-        rc, _, err = await _run_tmux("new-session", "-d", "-s", session, "-c", str(proj_path), timeout=10)
-        if rc != 0:
-            # Cleanup created dir
-            shutil.rmtree(proj_path, ignore_errors=True)
-            raise RuntimeError(f"tmux new-session failed: {err.strip() or rc}")
-        # Activate venv in the pane and start the coding agent
-        bridge = TmuxBridge(self.target_for(slug))
-        try:
-            # Activate venv if present; ignore errors
-            await bridge.send_keys("source .venv/bin/activate >/dev/null 2>&1 || true", send_enter=True)
-            if self.codex_cmd:
-                await bridge.send_keys(self.codex_cmd, send_enter=True)
-        except Exception:
-            pass
-        return Project(slug=slug, path=proj_path, session=session)
+
+    def _startup_command(self, venv_channel: str) -> str:
+        # Wait for the venv, activate it if present (ignore errors), run the agent,
+        # then leave an interactive shell in the pane once the agent exits. The shell is
+        # interactive (-i) so ~/.bashrc runs past its `case $-` guard and sets up PATH
+        # (nvm, npm-global) the way the pane's own login shell would
+        steps = [
+            f"tmux wait-for {shlex.quote(venv_channel)}",
+            "source .venv/bin/activate >/dev/null 2>&1 || true",
+        ]
+        if self.codex_cmd:
+            steps.append(self.codex_cmd)
+        steps.append('exec "${SHELL:-bash}"')
+        return "bash -ilc " + shlex.quote("; ".join(steps))
 
     async def delete(self, slug: str) -> Tuple[bool, str]:
         p = self.path_for(slug)
@@ -100,6 +123,7 @@ class ProjectsManager:
         # Kill tmux session if running
         session = self._session_name(slug)
         await _run_tmux("kill-session", "-t", session, timeout=5)
+        _drop_control_client(session)
         try:
             shutil.rmtree(p)
         except Exception as e:
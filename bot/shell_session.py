@@ -1,25 +1,109 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import os
+import re
+import secrets
 import shlex
+import signal
 import textwrap
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 
+from .utils import redact_env_value
 
-def _is_within(child: Path, parent: Path) -> bool:
+
+@functools.lru_cache(maxsize=1)
+def _env_baseline() -> Mapping[str, str]:
+    # Host environment, snapshotted on first use (after load_settings() has applied .env);
+    # sessions and /reset copy this instead of walking the os.environ proxy each time
+    return MappingProxyType(dict(os.environ))
+
+
+# Env keys that can be (un)set with `export`/`unset` in the coprocess
+_ENV_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# Commands whose effect must persist in the session; `cd` alone goes home
+_BUILTIN_RE = re.compile(r"(cd|source|\.|export|unset)(?: (.*))?", re.DOTALL)
+# `export KEY=VAL` with nothing shlex would need to unquote or split
+_EXPORT_ASSIGN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*=[^\s'\"\\]*")
+
+
+# Output kept per stream and command; anything past it is read and dropped
+_OUTPUT_CAP = 1024 * 1024
+_TRUNCATED_NOTE = b"\n[output truncated]\n"
+
+
+async def _read_until(stream: asyncio.StreamReader, marker: bytes, cap: int = _OUTPUT_CAP) -> bytes:
+    """Read up to `marker` (consumed, not returned), beyond the reader's line limit.
+
+    Only the first `cap` bytes are kept, so a runaway command cannot grow the bot's memory.
+    """
+    parts = []
+    room = cap
+    while True:
+        try:
+            data = await stream.readuntil(marker)
+            data = data[: -len(marker)]
+            done = True
+        except asyncio.LimitOverrunError as e:
+            data = await stream.readexactly(e.consumed)
+            done = False
+        if room > 0:
+            parts.append(data[:room])
+        room -= len(data)
+        if done:
+            if room < 0:
+                parts.append(_TRUNCATED_NOTE)
+            return b"".join(parts)
+
+
+# A `.env` line: optional `export`, then NAME=value (bash only splits on space and tab)
+_DOTENV_LINE_RE = re.compile(r"[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)=(.*)")
+# Line breaks other than \n that str.splitlines/shlex honour but bash keeps in values (CRLF files)
+_OTHER_LINE_BREAKS_RE = re.compile("[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+# Anything that bash would expand, run or redirect needs the real `source`
+_SHELL_SYNTAX = frozenset("$`\\;&|<>()~")
+
+
+def _parse_dotenv(text: str) -> Optional[Dict[str, str]]:
+    """Parse a file made only of plain assignments; None if it needs bash."""
+    if _OTHER_LINE_BREAKS_RE.search(text):
+        return None
+    parsed: Dict[str, str] = {}
+    for line in text.split("\n"):
+        stripped = line.strip(" \t")
+        if not stripped or stripped.startswith("#"):
+            continue
+        m = _DOTENV_LINE_RE.fullmatch(line)
+        if m is None:
+            return None
+        key, raw = m.groups()
+        # `A= b` runs `b` with A empty in bash; shlex would silently drop the space
+        if raw[:1].isspace() or not _SHELL_SYNTAX.isdisjoint(raw):
+            return None
+        try:
+            words = shlex.split(raw)
+        except ValueError:
+            return None
+        if len(words) > 1:
+            return None
+        parsed[key] = words[0] if words else ""
+    return parsed
+
+
+def _is_within(child: Path, resolved_parent: Path) -> bool:
     try:
-        child.resolve().relative_to(parent.resolve())
-        return True
+        return child.resolve().is_relative_to(resolved_parent)
     except Exception:
         return False
 
 
-def _clamp_cwd(path: Path, workspace_root: Path) -> Path:
+def _clamp_cwd(path: Path, workspace_root: Path, resolved_root: Path) -> Path:
     p = path.resolve()
-    if _is_within(p, workspace_root):
+    if p.is_relative_to(resolved_root):
         return p
     return workspace_root
 
@@ -31,20 +115,62 @@ class ShellSession:
     - Constrains cwd to `workspace_root`.
     - Persists env across commands.
     - Intercepts `cd`, `source`/`.` and `export`/`unset` to persist state.
+    - Runs other commands in a long-lived `bash -l` coprocess, each in its own subshell.
     """
 
     workspace_root: Path
     cwd: Path
-    env: Dict[str, str] = field(default_factory=lambda: dict(os.environ))
+    env: Dict[str, str] = field(default_factory=lambda: dict(_env_baseline()))
+    # Bumped on every in-place env mutation; keys the redacted listing cache
+    _env_version: int = field(default=0, init=False, repr=False, compare=False)
+    _env_cache: Optional[Tuple[Dict[str, str], int, str]] = field(default=None, init=False, repr=False, compare=False)
+    # (workspace_root, workspace_root.resolve()); redone when the root is reassigned
+    _root_cache: Optional[Tuple[Path, Path]] = field(default=None, init=False, repr=False, compare=False)
+    # Persistent bash coprocess and the env it was last synced to
+    _bash: Optional[asyncio.subprocess.Process] = field(default=None, init=False, repr=False, compare=False)
+    _bash_env: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _bash_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False, repr=False, compare=False)
+    _sentinel: str = field(default_factory=lambda: f"__devgram_{secrets.token_hex(16)}__", init=False, repr=False, compare=False)
 
     def reset(self) -> None:
         self.cwd = self.workspace_root
         # Start with host environment as a baseline; could also start empty
-        self.env = dict(os.environ)
+        self.env = dict(_env_baseline())
+        self.close()
+
+    def close(self) -> None:
+        """Kill the bash coprocess (and anything it left running); the next run starts a fresh one."""
+        proc, self._bash = self._bash, None
+        if proc is not None and proc.returncode is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    async def aclose(self) -> None:
+        """Like `close`, but also reap the coprocess; use it when the event loop may stop next."""
+        proc = self._bash
+        self.close()
+        if proc is not None:
+            await proc.wait()
+
+    def _resolved_root(self) -> Path:
+        cache = self._root_cache
+        if cache is None or cache[0] != self.workspace_root:
+            cache = self._root_cache = (self.workspace_root, self.workspace_root.resolve())
+        return cache[1]
+
+    def redacted_env(self) -> str:
+        """Return sorted `KEY=value` lines with secrets redacted, cached until env changes."""
+        cache = self._env_cache
+        if cache is None or cache[0] is not self.env or cache[1] != self._env_version:
+            text = "\n".join(f"{k}={redact_env_value(k, v)}" for k, v in sorted(self.env.items()))
+            cache = self._env_cache = (self.env, self._env_version, text)
+        return cache[2]
 
     def change_dir(self, target: str) -> Tuple[bool, str]:
         target_path = (self.cwd / target).resolve() if not target.startswith("/") else Path(target)
-        new_cwd = _clamp_cwd(target_path, self.workspace_root)
+        new_cwd = _clamp_cwd(target_path, self.workspace_root, self._resolved_root())
         if not new_cwd.exists() or not new_cwd.is_dir():
             return False, f"No such directory: {target}"
         self.cwd = new_cwd
@@ -57,20 +183,26 @@ class ShellSession:
         """
         # Resolve path relative to current cwd
         file_path = (self.cwd / script_path).resolve() if not script_path.startswith("/") else Path(script_path)
-        if not _is_within(file_path, self.workspace_root):
+        if not _is_within(file_path, self._resolved_root()):
             return False, "Refusing to source outside workspace"
         if not file_path.exists():
             return False, f"No such file: {script_path}"
 
+        # Plain KEY=VALUE files don't need a subshell
+        try:
+            # Decode the bytes directly: read_text() would turn CRLF into LF
+            parsed = _parse_dotenv(file_path.read_bytes().decode())
+        except (OSError, UnicodeDecodeError):
+            parsed = None
+        if parsed is not None:
+            self.env = {**self.env, **parsed}
+            return True, f"Applied: {script_path}"
+
         # Run bash, source the file, then print env as NUL-separated lines
         quoted = shlex.quote(str(file_path))
         # set -a auto-exports simple KEY=VALUE lines, making .env files easier
-        cmd = (
-            "bash -lc "
-            + shlex.quote(f"set -a; source {quoted} >/dev/null 2>&1; set +a; env -0")
-        )
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
+        proc = await asyncio.create_subprocess_exec(
+            "bash", "-lc", f"set -a; source {quoted} >/dev/null 2>&1; set +a; env -0",
             cwd=str(self.cwd),
             env=self.env,
             stdout=asyncio.subprocess.PIPE,
@@ -94,25 +226,26 @@ class ShellSession:
             self.env = merged
         return True, f"Applied: {script_path}"
 
-    def _apply_export_or_unset(self, command: str) -> Optional[str]:
-        # Persist `export KEY=VAL` and `unset KEY` locally
-        stripped = command.strip()
-        if stripped.startswith("export "):
-            rest = stripped[len("export ") :].strip()
-            if not rest:
-                return "Usage: export KEY=VALUE"
-            for part in shlex.split(rest):
-                if "=" not in part:
-                    return f"Invalid export: {part}"
-                key, value = part.split("=", 1)
-                self.env[key] = value
-            return None
-        if stripped.startswith("unset "):
-            key = stripped[len("unset ") :].strip()
-            if not key:
-                return "Usage: unset KEY"
-            self.env.pop(key, None)
-            return None
+    def _apply_export(self, rest: str) -> Optional[str]:
+        # Persist `export KEY=VAL` locally
+        if not rest:
+            return "Usage: export KEY=VALUE"
+        # A single unquoted assignment needs no tokenizing
+        parts = [rest] if _EXPORT_ASSIGN_RE.fullmatch(rest) else shlex.split(rest)
+        for part in parts:
+            if "=" not in part:
+                return f"Invalid export: {part}"
+            key, value = part.split("=", 1)
+            self.env[key] = value
+            self._env_version += 1
+        return None
+
+    def _apply_unset(self, key: str) -> Optional[str]:
+        # Persist `unset KEY` locally
+        if not key:
+            return "Usage: unset KEY"
+        self.env.pop(key, None)
+        self._env_version += 1
         return None
 
     async def run(self, command: str, timeout: int = 60) -> Tuple[int, str, str]:
@@ -125,46 +258,92 @@ class ShellSession:
 
         # Intercept cd/source/export/unset to persist state
         stripped = command.strip()
-        if stripped.startswith("cd ") or stripped == "cd":
-            if stripped == "cd":
-                ok, msg = self.change_dir(str(self.workspace_root))
-            else:
-                arg = stripped[3:].strip()
-                ok, msg = self.change_dir(arg)
-            return 0 if ok else 1, msg + "\n", ""
-
-        if stripped.startswith("source "):
-            arg = stripped[len("source ") :].strip()
-            ok, msg = await self.apply_source(arg)
-            return 0 if ok else 1, msg + "\n", ""
-        if stripped.startswith(". "):
-            arg = stripped[len(". ") :].strip()
-            ok, msg = await self.apply_source(arg)
-            return 0 if ok else 1, msg + "\n", ""
-
-        err = self._apply_export_or_unset(stripped)
-        if err is not None:
-            if err:
-                return 1, "", err + "\n"
-            return 0, "", ""
-
-        # For general commands, run via bash -lc to support pipes, redirects, etc.
-        bash_cmd = f"bash -lc {shlex.quote(stripped)}"
-        proc = await asyncio.create_subprocess_shell(
-            bash_cmd,
+        m = _BUILTIN_RE.fullmatch(stripped)
+        if m is not None:
+            name, arg = m.groups()
+            if name == "cd":
+                ok, msg = self.change_dir(arg.strip() if arg else str(self.workspace_root))
+                return 0 if ok else 1, msg + "\n", ""
+            if arg is not None:
+                arg = arg.strip()
+                if name in ("source", "."):
+                    ok, msg = await self.apply_source(arg)
+                    return 0 if ok else 1, msg + "\n", ""
+                err = self._apply_export(arg) if name == "export" else self._apply_unset(arg)
+                if err:
+                    return 1, "", err + "\n"
+                return 0, "", ""
+
+        # For general commands, run via bash to support pipes, redirects, etc.
+        async with self._bash_lock:
+            return await self._run_in_bash(stripped, timeout)
+
+    async def _start_bash(self, timeout: int) -> asyncio.subprocess.Process:
+        proc = await asyncio.create_subprocess_exec(
+            "bash", "-l",
             cwd=str(self.cwd),
             env=self.env,
+            stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            # Own process group, so a timeout can kill whatever the command spawned
+            start_new_session=True,
+        )
+        self._bash = proc
+        self._bash_env = dict(self.env)
+        # Discard anything the login profile prints before the first command
+        await asyncio.wait_for(self._exchange(proc, ""), timeout=timeout)
+        return proc
+
+    def _env_sync_script(self) -> str:
+        lines = [f"unset {k}" for k in self._bash_env.keys() - self.env.keys() if _ENV_NAME_RE.fullmatch(k)]
+        for k, v in self.env.items():
+            if self._bash_env.get(k) != v and _ENV_NAME_RE.fullmatch(k):
+                lines.append(f"export {k}={shlex.quote(v)}")
+        self._bash_env = dict(self.env)
+        if not lines:
+            return ""
+        # Readonly names (UID, ...) fail noisily; keep that out of the command's stderr
+        return "{ " + "; ".join(lines) + "; } 2>/dev/null\n"
+
+    async def _exchange(self, proc: asyncio.subprocess.Process, script: str) -> Tuple[int, bytes, bytes]:
+        # Markers go out on both streams once the script finishes; stderr also carries $?
+        sentinel = self._sentinel
+        proc.stdin.write(
+            (
+                f"{script}\n__rc=$?; printf '%s' '{sentinel}'; "
+                f"printf '%s%d%s' '{sentinel}' \"$__rc\" '{sentinel}' >&2\n"
+            ).encode()
         )
+        await proc.stdin.drain()
+        marker = sentinel.encode()
+
+        async def _stderr() -> Tuple[bytes, bytes]:
+            return await _read_until(proc.stderr, marker), await _read_until(proc.stderr, marker)
 
+        out, (err, rc) = await asyncio.gather(_read_until(proc.stdout, marker), _stderr())
         try:
-            out, err = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            code = int(rc)
+        except ValueError:
+            code = 1
+        return code, out, err
+
+    async def _run_in_bash(self, command: str, timeout: int) -> Tuple[int, str, str]:
+        try:
+            proc = self._bash
+            if proc is None or proc.returncode is not None:
+                proc = await self._start_bash(timeout)
+            # A subshell keeps `exit`, `set -e`, traps etc. from leaking into the coprocess;
+            # stdin is closed so commands cannot read the marker lines
+            script = (
+                self._env_sync_script()
+                + f"( cd -- {shlex.quote(str(self.cwd))} && eval {shlex.quote(command)} ) </dev/null"
+            )
+            rc, out, err = await asyncio.wait_for(self._exchange(proc, script), timeout=timeout)
         except asyncio.TimeoutError:
-            try:
-                proc.kill()
-            except ProcessLookupError:
-                pass
+            self.close()
             return 124, "", f"[timeout after {timeout}s]\n"
-
-        return proc.returncode or 0, out.decode(errors="replace"), err.decode(errors="replace")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            return 1, "", "[shell exited unexpectedly; it will be restarted]\n"
+        return rc, out.decode(errors="replace"), err.decode(errors="replace")
@@ -1,16 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import re
 import shutil
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
 
+@functools.lru_cache(maxsize=1)
 def _tmux_exists() -> bool:
+    # PATH is treated as fixed for the life of the process
     return shutil.which("tmux") is not None
 
 
 async def _run_tmux(*args: str, timeout: int = 10) -> Tuple[int, str, str]:
+    rc, out, err = await _run_tmux_raw(*args, timeout=timeout)
+    return rc, out.decode(errors="replace"), err
+
+
+async def _run_tmux_raw(*args: str, timeout: int = 10) -> Tuple[int, bytes, str]:
+    """Like `_run_tmux`, but leaves stdout undecoded."""
     proc = await asyncio.create_subprocess_exec(
         "tmux",
         *args,
@@ -24,8 +35,194 @@ async def _run_tmux(*args: str, timeout: int = 10) -> Tuple[int, str, str]:
             proc.kill()
         except ProcessLookupError:
             pass
-        return 124, "", f"tmux timeout after {timeout}s"
-    return proc.returncode or 0, out.decode(errors="replace"), err.decode(errors="replace")
+        return 124, b"", f"tmux timeout after {timeout}s"
+    return proc.returncode or 0, out, err.decode(errors="replace")
+
+
+_CONTROL_RETRY_SECONDS = 5.0
+_CONTROL_LINE_LIMIT = 4 * 1024 * 1024
+# Arguments that need no quoting in tmux command syntax
+_CONTROL_SAFE_RE = re.compile(r"[A-Za-z0-9_./:@%+=-]+")
+
+
+def _control_quote(arg: str) -> Optional[str]:
+    if _CONTROL_SAFE_RE.fullmatch(arg):
+        return arg
+    # Single quotes are literal in tmux syntax; anything harder goes through argv instead
+    if "'" not in arg and "\n" not in arg:
+        return f"'{arg}'"
+    return None
+
+
+class _ControlClient:
+    """Long-lived `tmux -C` client; runs commands over a pipe instead of spawning tmux."""
+
+    def __init__(self, session: str):
+        self.session = session
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Deque[asyncio.Future] = deque()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None and self._reader is not None and not self._reader.done()
+
+    async def start(self) -> None:
+        self._proc = await asyncio.create_subprocess_exec(
+            "tmux", "-C", "attach-session", "-t", self.session,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_CONTROL_LINE_LIMIT,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+        try:
+            # Pane output notifications are not needed; this doubles as a liveness check
+            await self.command("refresh-client", "-f", "no-output")
+        except RuntimeError:
+            if not self.alive:
+                raise
+
+    def close(self) -> None:
+        if self._proc is not None and self._proc.returncode is None:
+            try:
+                self._proc.kill()
+            except ProcessLookupError:
+                pass
+
+    async def aclose(self) -> None:
+        """Like `close`, but also wait for the reader to reap the client process."""
+        self.close()
+        if self._reader is not None:
+            await self._reader
+
+    async def command(self, *args: str, timeout: int = 10) -> bytes:
+        if not self.alive:
+            raise RuntimeError("tmux control client is not running")
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append(fut)
+        try:
+            self._proc.stdin.write(" ".join(args).encode() + b"\n")
+            await self._proc.stdin.drain()
+        except ConnectionError:
+            raise RuntimeError("tmux control client is not running") from None
+        try:
+            ok, out = await asyncio.wait_for(fut, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Replies arrive in order; a lost one would misroute every later reply
+            self.close()
+            raise RuntimeError(f"tmux control timeout after {timeout}s")
+        if not ok:
+            raise RuntimeError(out.decode(errors="replace").strip() or "tmux command failed")
+        return out
+
+    async def _read_loop(self) -> None:
+        stdout = self._proc.stdout
+        block: Optional[List[bytes]] = None
+        tag = b""
+        try:
+            while True:
+                line = await stdout.readline()
+                if not line:
+                    break
+                if block is None:
+                    # %begin <time> <number> <flags>; flags=1 marks replies to our commands
+                    parts = line.split()
+                    if parts[:1] == [b"%begin"] and parts[3:4] == [b"1"]:
+                        block, tag = [], parts[2]
+                    continue
+                parts = line.split()
+                if parts[:1] in ([b"%end"], [b"%error"]) and parts[2:3] == [tag]:
+                    fut = self._pending.popleft() if self._pending else None
+                    if fut is not None and not fut.done():
+                        fut.set_result((parts[0] == b"%end", b"".join(block)))
+                    block = None
+                else:
+                    block.append(line)
+        except ValueError:
+            # A line exceeded the stream limit; framing is lost, so give up on this client
+            pass
+        finally:
+            self.close()
+            while self._pending:
+                fut = self._pending.popleft()
+                if not fut.done():
+                    fut.set_exception(RuntimeError("tmux control client exited"))
+            await self._proc.wait()
+
+
+_CONTROL_CLIENTS: Dict[str, _ControlClient] = {}
+_CONTROL_RETRY_AT: Dict[str, float] = {}
+_CONTROL_LOCK = asyncio.Lock()
+
+
+async def _control_client(session: str) -> Optional[_ControlClient]:
+    client = _CONTROL_CLIENTS.get(session)
+    if client is not None and client.alive:
+        return client
+    async with _CONTROL_LOCK:
+        client = _CONTROL_CLIENTS.get(session)
+        if client is not None and client.alive:
+            return client
+        loop = asyncio.get_running_loop()
+        if loop.time() < _CONTROL_RETRY_AT.get(session, 0.0):
+            return None
+        client = _ControlClient(session)
+        try:
+            await client.start()
+        except Exception:
+            client.close()
+            _CONTROL_CLIENTS.pop(session, None)
+            _CONTROL_RETRY_AT[session] = loop.time() + _CONTROL_RETRY_SECONDS
+            return None
+        _CONTROL_CLIENTS[session] = client
+        return client
+
+
+def _drop_control_client(session: str) -> None:
+    """Close and forget the control client of a session that is going away."""
+    client = _CONTROL_CLIENTS.pop(session, None)
+    if client is not None:
+        client.close()
+    _CONTROL_RETRY_AT.pop(session, None)
+
+
+async def close_control_clients() -> None:
+    """Close every control client and wait for them to exit; call before the event loop stops."""
+    clients = list(_CONTROL_CLIENTS.values())
+    _CONTROL_CLIENTS.clear()
+    _CONTROL_RETRY_AT.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+async def _run_tmux_control(session: str, *args: str, timeout: int = 10) -> Optional[bytes]:
+    """Run a tmux command over the session's control client.
+
+    Returns None when control mode is unusable (caller should fall back to `_run_tmux`);
+    raises RuntimeError when tmux reports an error for the command itself.
+    """
+    quoted = [_control_quote(a) for a in args]
+    if None in quoted:
+        return None
+    client = await _control_client(session)
+    if client is None:
+        return None
+    try:
+        return await client.command(*quoted, timeout=timeout)
+    except RuntimeError:
+        if not client.alive:
+            return None
+        raise
+
+
+def _escape_tmux_arg(arg: str) -> str:
+    # tmux treats an argument ending in ";" as a command separator; a backslash before it keeps it literal
+    if arg.endswith(";"):
+        return arg[:-1] + "\\;"
+    return arg
+
+
+_ANCHOR_LEN = 256
 
 
 def _increment(prev: str, new: str) -> str:
@@ -33,14 +230,31 @@ def _increment(prev: str, new: str) -> str:
         return new
     # Find the longest suffix of prev that is a prefix of new
     max_overlap = min(len(prev), len(new))
-    start = 0
-    # Optimize by checking a window near the end of prev
-    # simple rolling overlap
-    for k in range(max_overlap, 0, -1):
-        if prev[-k:] == new[:k]:
-            start = k
+    if max_overlap == 0:
+        return new
+    # Any overlap of at least len(anchor) chars ends with prev's tail, so locate
+    # candidates with str.rfind (longest first) instead of comparing every length
+    anchor = prev[-min(_ANCHOR_LEN, max_overlap):]
+    a = len(anchor)
+    end = max_overlap
+    while True:
+        p = new.rfind(anchor, 0, end)
+        if p < 0:
             break
-    return new[start:]
+        k = p + a
+        if new[:p] == prev[-k:-a]:
+            return new[k:]
+        end = k - 1
+    # Shorter overlaps: at most _ANCHOR_LEN small comparisons
+    for k in range(a - 1, 0, -1):
+        if prev[-k:] == new[:k]:
+            return new[k:]
+    return new
+
+
+# Pane polling: first delay after a change, and growth factor while unchanged
+_POLL_MIN_SECONDS = 0.05
+_POLL_BACKOFF = 1.5
 
 
 @dataclass
@@ -54,58 +268,110 @@ class TmuxBridge:
         self.target = target
         self.capture_lines = capture_lines
 
+    @property
+    def session(self) -> str:
+        return self.target.split(":", 1)[0]
+
     async def capture(self) -> str:
+        return (await self._capture_bytes()).decode(errors="replace")
+
+    async def _capture_bytes(self) -> bytes:
         # -p print, -J join wrapped lines, -S -N from N lines before bottom
-        rc, out, err = await _run_tmux(
-            "capture-pane", "-p", "-J", "-t", self.target, "-S", f"-{self.capture_lines}",
-            timeout=10,
-        )
+        args = ("capture-pane", "-p", "-J", "-t", self.target, "-S", f"-{self.capture_lines}")
+        try:
+            out = await _run_tmux_control(self.session, *args, timeout=10)
+        except RuntimeError as e:
+            raise RuntimeError(f"tmux capture-pane failed: {e}") from None
+        if out is not None:
+            return out
+        rc, out, err = await _run_tmux_raw(*args, timeout=10)
         if rc != 0:
             raise RuntimeError(f"tmux capture-pane failed: {err.strip() or rc}")
         return out
 
+    async def _pane_state(self) -> Tuple[bytes, bytes]:
+        """Return raw (history size, visible screen): a cheap fingerprint for change polling."""
+        hist_args = ("display-message", "-p", "-t", self.target, "#{history_size}")
+        vis_args = ("capture-pane", "-p", "-J", "-t", self.target)
+        try:
+            # Both commands are written back to back on the control pipe
+            hist, visible = await asyncio.gather(
+                _run_tmux_control(self.session, *hist_args, timeout=10),
+                _run_tmux_control(self.session, *vis_args, timeout=10),
+            )
+        except RuntimeError as e:
+            raise RuntimeError(f"tmux capture-pane failed: {e}") from None
+        if hist is not None and visible is not None:
+            return hist.strip(), visible
+        rc, out, err = await _run_tmux_raw(*hist_args, ";", *vis_args, timeout=10)
+        if rc != 0:
+            raise RuntimeError(f"tmux capture-pane failed: {err.strip() or rc}")
+        hist_line, _, screen = out.partition(b"\n")
+        return hist_line.strip(), screen
+
     async def send_keys(self, text: str, send_enter: bool = True) -> None:
-        # Send each line; end with Enter to submit
+        # Send each line literally followed by C-j (newline within the app), then Enter
+        # to submit. Everything goes out as one chained tmux invocation.
+        args: List[str] = []
         for part in text.splitlines():
-            rc, _, err = await _run_tmux("send-keys", "-t", self.target, part, timeout=10)
-            if rc != 0:
-                raise RuntimeError(f"tmux send-keys failed: {err.strip() or rc}")
-            # Add literal newline within the app if multi-line message
-            rc, _, err = await _run_tmux("send-keys", "-t", self.target, "C-j", timeout=10)
-            if rc != 0:
-                raise RuntimeError(f"tmux send-keys newline failed: {err.strip() or rc}")
+            if part:
+                args += ["send-keys", "-t", self.target, "-l", "--", _escape_tmux_arg(part), ";"]
+            args += ["send-keys", "-t", self.target, "C-j", ";"]
         if send_enter:
-            rc, _, err = await _run_tmux("send-keys", "-t", self.target, "Enter", timeout=10)
-            if rc != 0:
-                raise RuntimeError(f"tmux send-keys Enter failed: {err.strip() or rc}")
+            args += ["send-keys", "-t", self.target, "Enter"]
+        elif args:
+            args.pop()
+        if not args:
+            return
+        rc, _, err = await _run_tmux(*args, timeout=10)
+        if rc != 0:
+            raise RuntimeError(f"tmux send-keys failed: {err.strip() or rc}")
 
-    async def send_and_capture(self, text: str, *, prev_snapshot: str = "", timeout_seconds: int = 20) -> TmuxResult:
-        # Initialize snapshot if missing
-        if not prev_snapshot:
+    async def _poll_until_stable(
+        self, timeout_seconds: float, *, settle: float, max_delay: float, busy: Optional[Callable[[bytes], bool]] = None
+    ) -> None:
+        """Poll until the pane has been unchanged (and not `busy`) for `settle` seconds, or timeout.
+
+        Samples come fast right after a change and back off while the pane is quiet. Ticks
+        only look at the visible screen and history size; callers capture the scrollback once.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        # Samples stay as bytes; comparing them is a memcmp, with no decode per tick
+        last: Optional[Tuple[bytes, bytes]] = None
+        since = 0.0
+        delay = _POLL_MIN_SECONDS
+        while True:
+            now = loop.time()
+            if now >= deadline:
+                return
+            # The next delay runs while this sample is taken, so a tick costs
+            # max(delay, capture) instead of their sum
+            nap = asyncio.ensure_future(asyncio.sleep(delay))
             try:
-                prev_snapshot = await self.capture()
-            except Exception:
-                prev_snapshot = ""
+                cur = await self._pane_state()
+                if cur != last:
+                    last, since = cur, now
+                    delay = _POLL_MIN_SECONDS
+                else:
+                    if busy is not None and busy(cur[1]):
+                        since = now
+                    elif now - since >= settle:
+                        return
+                    delay = min(delay * _POLL_BACKOFF, max_delay)
+                await nap
+            finally:
+                nap.cancel()
 
-        await self.send_keys(text, send_enter=True)
+    async def send_and_capture(self, text: str, *, prev_snapshot: str = "", timeout_seconds: int = 20) -> TmuxResult:
+        prev_snapshot = await self.send(text, prev_snapshot=prev_snapshot)
 
-        # Poll until output stabilizes or timeout
-        deadline = asyncio.get_event_loop().time() + timeout_seconds
-        last = await self.capture()
-        stable_count = 0
-        while asyncio.get_event_loop().time() < deadline:
-            await asyncio.sleep(0.35)
-            cur = await self.capture()
-            if cur == last:
-                stable_count += 1
-                if stable_count >= 2:  # ~700ms unchanged
-                    break
-            else:
-                last = cur
-                stable_count = 0
+        # Poll until output stabilizes (~700ms unchanged) or timeout
+        await self._poll_until_stable(timeout_seconds, settle=0.7, max_delay=0.35)
 
-        increment = _increment(prev_snapshot, last)
-        return TmuxResult(snapshot=last, increment=increment)
+        snapshot = await self.capture()
+        increment = _increment(prev_snapshot, snapshot)
+        return TmuxResult(snapshot=snapshot, increment=increment)
 
     @staticmethod
     def _looks_working(text: str) -> bool:
@@ -117,7 +383,13 @@ class TmuxBridge:
             return True
         return False
 
-    async def send_and_wait_idle(self, text: str, *, prev_snapshot: str = "", timeout_seconds: int = 60) -> TmuxResult:
+    @classmethod
+    def _screen_busy(cls, screen: bytes) -> bool:
+        # Only quiet ticks get here, so the visible screen is decoded at most once per tick
+        return cls._looks_working(screen.decode(errors="replace"))
+
+    async def send(self, text: str, *, prev_snapshot: str = "") -> str:
+        """Send `text` and return the snapshot to diff the eventual output against."""
         # Initialize snapshot if missing
         if not prev_snapshot:
             try:
@@ -126,30 +398,19 @@ class TmuxBridge:
                 prev_snapshot = ""
 
         await self.send_keys(text, send_enter=True)
+        return prev_snapshot
 
-        deadline = asyncio.get_event_loop().time() + timeout_seconds
-        last = await self.capture()
-        stable_count = 0
+    async def wait_idle(self, prev_snapshot: str, *, timeout_seconds: int = 60) -> TmuxResult:
+        # Wait for terminal to become idle: content stable (~1.5s) and no "Working"/"Esc to interrupt"
+        await self._poll_until_stable(timeout_seconds, settle=1.5, max_delay=0.5, busy=self._screen_busy)
 
-        # Wait for terminal to become idle: content stable and no "Working"/"Esc to interrupt"
-        while asyncio.get_event_loop().time() < deadline:
-            await asyncio.sleep(0.5)
-            cur = await self.capture()
+        snapshot = await self.capture()
+        increment = _increment(prev_snapshot, snapshot)
+        return TmuxResult(snapshot=snapshot, increment=increment)
 
-            if cur == last:
-                if not self._looks_working(cur):
-                    stable_count += 1
-                else:
-                    stable_count = 0
-            else:
-                last = cur
-                stable_count = 0
-
-            if stable_count >= 3:  # ~1.5s idle
-                break
-
-        increment = _increment(prev_snapshot, last)
-        return TmuxResult(snapshot=last, increment=increment)
+    async def send_and_wait_idle(self, text: str, *, prev_snapshot: str = "", timeout_seconds: int = 60) -> TmuxResult:
+        prev_snapshot = await self.send(text, prev_snapshot=prev_snapshot)
+        return await self.wait_idle(prev_snapshot, timeout_seconds=timeout_seconds)
 
     @staticmethod
     def available() -> bool:
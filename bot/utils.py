@@ -9,9 +9,12 @@ from typing import Optional, Tuple
 TELEGRAM_MAX = 4000
 
 
+# Env names that look like they hold credentials
+_SECRET_RE = re.compile(r"secret|token|key|passw(?:or)?d")
+
+
 def redact_env_value(key: str, value: str) -> str:
-    k = key.lower()
-    if any(s in k for s in ("secret", "token", "key", "password", "passwd")):
+    if _SECRET_RE.search(key.lower()):
         if not value:
             return value
         if len(value) <= 8:
@@ -23,16 +26,11 @@ def redact_env_value(key: str, value: str) -> str:
 def chunk_text(text: str, limit: int = TELEGRAM_MAX) -> list[str]:
     if len(text) <= limit:
         return [text]
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(len(text), start + limit)
-        chunks.append(text[start:end])
-        start = end
-    return chunks
+    return [text[i:i + limit] for i in range(0, len(text), limit)]
 
 
-CODE_BLOCK_RE = re.compile(r"```(\w+)?\n([\s\S]*?)```", re.MULTILINE)
+# Info string allowed between the opening fence and its newline
+_FENCE_LANG_RE = re.compile(r"\w*")
 
 
 @dataclass
@@ -42,10 +40,17 @@ class CodeBlock:
 
 
 def extract_code_block(text: str) -> Optional[CodeBlock]:
-    m = CODE_BLOCK_RE.search(text)
-    if not m:
-        return None
-    lang = (m.group(1) or "").strip().lower() or None
-    code = m.group(2)
-    return CodeBlock(lang=lang, code=code)
-
+    # First ```lang\n ... ``` block, found with str.find rather than a lazy regex
+    start = text.find("```")
+    while start >= 0:
+        nl = text.find("\n", start + 3)
+        if nl < 0:
+            return None
+        if _FENCE_LANG_RE.fullmatch(text, start + 3, nl):
+            end = text.find("```", nl + 1)
+            if end < 0:
+                return None
+            lang = text[start + 3 : nl].lower() or None
+            return CodeBlock(lang=lang, code=text[nl + 1 : end])
+        start = text.find("```", start + 1)
+    return None
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from bot import bot as botmod
+from bot.bot import BotApp
+from bot.config import Settings
+
+
+@pytest.fixture
+def settings(tmp_path):
+    workspace = tmp_path / "ws"
+    (workspace / "projects").mkdir(parents=True)
+    return Settings(
+        telegram_bot_token="test",
+        allowed_user_ids=frozenset({1}),
+        workspace_dir=workspace,
+        projects_dir=workspace / "projects",
+        data_dir=tmp_path / "data",
+    )
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record session file writes, slowed down so they overlap with other work."""
+    log = {"paths": [], "active": 0, "max_active": 0, "delay": 0.0, "delay_after": 0.0}
+    lock = threading.Lock()
+    real = botmod._write_session_file
+
+    def slow_write(path, payload):
+        with lock:
+            log["paths"].append(path)
+            log["active"] += 1
+            log["max_active"] = max(log["max_active"], log["active"])
+        try:
+            time.sleep(log["delay"])
+            mtime = real(path, payload)
+            # The file is already replaced, but the caller has not recorded its mtime yet
+            time.sleep(log["delay_after"])
+            return mtime
+        finally:
+            with lock:
+                log["active"] -= 1
+
+    monkeypatch.setattr(botmod, "_write_session_file", slow_write)
+    return log
+
+
+def _on_disk(app, chat_id):
+    return json.loads(app._session_path(chat_id).read_text())
+
+
+def test_burst_of_saves_is_one_write(settings, writes):
+    async def main():
+        app = BotApp(settings)
+        sess = await app.get_session(1)
+        for mode in ("term", "shell", "term"):
+            sess.mode = mode
+            await app.save_session(1)
+        await app._flush_task
+        assert len(writes["paths"]) == 1
+        assert _on_disk(app, 1)["mode"] == "term"
+        await app.shutdown()
+
+    asyncio.run(main())
+
+
+def test_writes_for_one_chat_never_overlap(settings, writes):
+    writes["delay"] = 0.3
+
+    async def main():
+        app = BotApp(settings)
+        sess = await app.get_session(1)
+        sess.mode = "term"
+        await app.save_session(1)
+        # Change the session again while the flush loop's write is in flight
+        while 1 not in app._writing:
+            await asyncio.sleep(0.01)
+        sess.shell.env["LAST"] = "change"
+        await app.save_session(1)
+        await app.flush_sessions()
+        await app.shutdown()
+        assert writes["max_active"] == 1
+        assert _on_disk(app, 1)["env"]["LAST"] == "change"
+
+    asyncio.run(main())
+
+
+def test_eviction_writes_dirty_session(settings, writes, monkeypatch):
+    monkeypatch.setattr(botmod, "SESSION_CACHE_SIZE", 2)
+
+    async def main():
+        app = BotApp(settings)
+        sess = await app.get_session(1)
+        await sess.shell.run("true")
+        sess.mode = "term"
+        await app.save_session(1)
+        await app.get_session(2)
+        await app.get_session(3)
+        # Evicted before the coalescing delay ran out; written by the eviction itself
+        assert list(app.sessions) == [2, 3]
+        assert 1 not in app._dirty
+        assert writes["paths"] == [app._session_path(1)]
+        assert _on_disk(app, 1)["mode"] == "term"
+        assert sess.shell._bash is None
+        reloaded = await app.get_session(1)
+        assert reloaded is not sess and reloaded.mode == "term"
+        await app.shutdown()
+
+    asyncio.run(main())
+
+
+def test_reload_after_external_change(settings, writes):
+    async def main():
+        app = BotApp(settings)
+        sess = await app.get_session(1)
+        project = settings.projects_dir / "demo"
+        project.mkdir()
+        sess.shell.workspace_root = sess.shell.cwd = project
+        await app.save_session(1)
+        await app.flush_sessions()
+        await sess.shell.run("true")
+        # Untouched file: the cached object is reused
+        assert await app.get_session(1) is sess
+
+        path = app._session_path(1)
+        data = _on_disk(app, 1)
+        data["mode"] = "term"
+        path.write_text(json.dumps(data))
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        reloaded = await app.get_session(1)
+        assert reloaded is not sess
+        assert reloaded.mode == "term"
+        # The project clamp survives the reload, and the replaced session's shell is gone
+        assert reloaded.shell.workspace_root == project
+        assert sess.shell._bash is None
+        await app.shutdown()
+
+    asyncio.run(main())
+
+
+def test_get_session_during_write_keeps_memory(settings, writes):
+    writes["delay_after"] = 0.3
+
+    async def main():
+        app = BotApp(settings)
+        sess = await app.get_session(1)
+        await sess.shell.run("true")
+        proc = sess.shell._bash
+        sess.mode = "term"
+        await app.save_session(1)
+        while 1 not in app._writing:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        # The file on disk is newer than sess._mtime, but the session must not be rebuilt
+        assert await app.get_session(1) is sess
+        assert sess.shell._bash is proc
+        await app._flush_task
+        assert await app.get_session(1) is sess
+        await app.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import random
+import re
+
+from bot.projects import slugify
+
+_REFERENCE_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _slugify_reference(name):
+    s = _REFERENCE_RE.sub("-", name.strip().lower()).strip("-")
+    return s or "project"
+
+
+def test_slugify_matches_regex():
+    rng = random.Random(0)
+    alphabet = "aZ9 -_.\t\n!é/İ"
+    for _ in range(50_000):
+        name = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert slugify(name) == _slugify_reference(name), repr(name)
+
+
+def test_slugify_examples():
+    assert slugify("My Cool Project!") == "my-cool-project"
+    assert slugify("  --a__b--  ") == "a-b"
+    assert slugify("!!!") == "project"
+    assert slugify("Café 2") == "caf-2"
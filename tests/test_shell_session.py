@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+from bot import shell_session
+from bot.shell_session import ShellSession, _parse_dotenv, _read_until
+
+
+@pytest.fixture
+def run_shell(tmp_path):
+    """Run an async body against a fresh session rooted at tmp_path, then reap its bash."""
+
+    def _run(body):
+        async def main():
+            sess = ShellSession(workspace_root=tmp_path, cwd=tmp_path)
+            try:
+                return await body(sess)
+            finally:
+                await sess.aclose()
+
+        return asyncio.run(main())
+
+    return _run
+
+
+def test_exit_codes_and_streams(run_shell):
+    async def body(sess):
+        assert await sess.run("echo out; echo err >&2; exit 3") == (3, "out\n", "err\n")
+        assert await sess.run("printf noeol") == (0, "noeol", "")
+        assert await sess.run("false") == (1, "", "")
+
+    run_shell(body)
+
+
+def test_exit_and_set_e_stay_in_the_subshell(run_shell):
+    async def body(sess):
+        await sess.run("echo warm")
+        proc = sess._bash
+        assert (await sess.run("exit 7"))[0] == 7
+        assert await sess.run("set -e; false; echo no") == (1, "", "")
+        assert await sess.run("echo still") == (0, "still\n", "")
+        assert sess._bash is proc
+
+    run_shell(body)
+
+
+def test_stdin_is_closed(run_shell):
+    async def body(sess):
+        assert await sess.run("cat", timeout=5) == (0, "", "")
+
+    run_shell(body)
+
+
+def test_cd_and_export_persist(run_shell, tmp_path):
+    (tmp_path / "sub").mkdir()
+
+    async def body(sess):
+        assert await sess.run("cd sub") == (0, f"{tmp_path / 'sub'}\n", "")
+        assert await sess.run("export GREETING='a b'") == (0, "", "")
+        assert await sess.run('pwd; echo "$GREETING"') == (0, f"{tmp_path / 'sub'}\na b\n", "")
+        assert await sess.run("unset GREETING") == (0, "", "")
+        assert await sess.run('echo "[$GREETING]"') == (0, "[]\n", "")
+        # Env changed from Python is replayed into the coprocess
+        sess.env["QUOTED"] = "it's"
+        assert await sess.run('echo "$QUOTED"') == (0, "it's\n", "")
+
+    run_shell(body)
+
+
+def test_cd_is_clamped_to_workspace(run_shell, tmp_path):
+    async def body(sess):
+        rc, out, _ = await sess.run("cd /")
+        assert (rc, out) == (0, f"{tmp_path}\n")
+        assert await sess.run("pwd") == (0, f"{tmp_path}\n", "")
+
+    run_shell(body)
+
+
+def test_timeout_kills_and_restarts(run_shell):
+    async def body(sess):
+        assert await sess.run("sleep 30 & sleep 30", timeout=1) == (124, "", "[timeout after 1s]\n")
+        assert sess._bash is None
+        assert await sess.run("echo back") == (0, "back\n", "")
+
+    run_shell(body)
+
+
+def test_shell_exit_restarts(run_shell):
+    async def body(sess):
+        rc, _, err = await sess.run("kill -9 $$")
+        assert rc == 1 and "restarted" in err
+        assert await sess.run("echo back") == (0, "back\n", "")
+
+    run_shell(body)
+
+
+@pytest.mark.parametrize("size", [65535, 65536, 65537, 200_000])
+def test_output_past_reader_limit(run_shell, size):
+    async def body(sess):
+        rc, out, err = await sess.run(f"head -c {size} /dev/zero | tr '\\0' x")
+        assert (rc, err) == (0, "")
+        assert out == "x" * size
+
+    run_shell(body)
+
+
+@pytest.mark.parametrize("extra", [0, 1, 1_000_000])
+def test_output_cap(run_shell, extra):
+    cap = shell_session._OUTPUT_CAP
+
+    async def body(sess):
+        rc, out, _ = await sess.run(f"head -c {cap + extra} /dev/zero | tr '\\0' x; echo done >&2")
+        assert rc == 0
+        if extra:
+            assert out == "x" * cap + "\n[output truncated]\n"
+        else:
+            assert out == "x" * cap
+        # The dropped bytes were drained; the next command reads its own output
+        assert await sess.run("echo next") == (0, "next\n", "")
+
+    run_shell(body)
+
+
+def test_read_until_small_cap():
+    async def main():
+        reader = asyncio.StreamReader(limit=4)
+        reader.feed_data(b"abcdefghij--M--rest")
+        reader.feed_eof()
+        assert await _read_until(reader, b"--M--", cap=3) == b"abc" + shell_session._TRUNCATED_NOTE
+        assert await reader.read() == b"rest"
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("A=1\n", {"A": "1"}),
+        ("# comment\n\nexport B=2\n  C=3\n", {"B": "2", "C": "3"}),
+        ("D=\"x y\"\nE='lit'\nF=\n", {"D": "x y", "E": "lit", "F": ""}),
+        ("G=b \n", {"G": "b"}),
+    ],
+)
+def test_parse_dotenv_plain(text, expected):
+    assert _parse_dotenv(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "A=$HOME\n",
+        "A='$HOME'\n",
+        "A=`id`\n",
+        "A=~/x\n",
+        "A=$(id)\n",
+        "A=a;b\n",
+        "A=a b\n",
+        "A= b\n",
+        "A=\tb\n",
+        'A="unterminated\n',
+        "export A\n",
+        "echo hi\n",
+        "A-B=1\n",
+        "A=1\r\nB='x y'\r\n",
+        "A=1\x0cB=2\n",
+        "\xa0A=1\n",
+    ],
+)
+def test_parse_dotenv_falls_back(text):
+    assert _parse_dotenv(text) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "PLAIN=1\nexport Q='a b'\n",
+        "REF=$HOME/x\n",
+        "SPACE= true\n",
+        'MULTI="a\nb"\n',
+        "PLAIN=1\r\nQ='a b'\r\n",
+    ],
+)
+def test_source_matches_bash(run_shell, tmp_path, text):
+    """The Python fast path and the bash fallback must leave the same env behind."""
+    (tmp_path / "vars.env").write_text(text)
+
+    async def body(sess):
+        _, out, _ = await sess.run("bash --noprofile --norc -c 'set -a; source vars.env >/dev/null 2>&1; env -0'")
+        expected = dict(kv.split("=", 1) for kv in out.split("\0") if kv)
+        assert await sess.run("source vars.env") == (0, "Applied: vars.env\n", "")
+        for key in ("PLAIN", "Q", "REF", "SPACE", "MULTI"):
+            assert sess.env.get(key) == expected.get(key), key
+
+    run_shell(body)
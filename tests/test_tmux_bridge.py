@@ -0,0 +1,133 @@
+import asyncio
+import random
+import shutil
+import time
+
+import pytest
+
+from bot import tmux_bridge
+from bot.tmux_bridge import TmuxBridge, _escape_tmux_arg, _increment
+
+
+def _increment_reference(prev: str, new: str) -> str:
+    # The original quadratic scan: longest suffix of prev that is a prefix of new
+    for k in range(min(len(prev), len(new)), 0, -1):
+        if prev[-k:] == new[:k]:
+            return new[k:]
+    return new
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_increment_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(400):
+        alphabet = rng.choice(["ab", "ab\n", "abc x\n"])
+        prev = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 700)))
+        if prev and rng.random() < 0.7:
+            # Usually the new capture continues the previous one, as in a scrolling pane
+            start = rng.randint(0, len(prev))
+            tail = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 300)))
+            new = prev[start:] + tail
+        else:
+            new = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 700)))
+        assert _increment(prev, new) == _increment_reference(prev, new)
+
+
+def test_increment_edge_cases():
+    assert _increment("", "abc") == "abc"
+    assert _increment("abc", "") == ""
+    assert _increment("abc", "abc") == ""
+    assert _increment("xxabc", "abcdef") == "def"
+    long_prev = "line\n" * 1000
+    assert _increment(long_prev, long_prev + "next\n") == "next\n"
+
+
+def test_escape_tmux_arg():
+    assert _escape_tmux_arg("plain") == "plain"
+    assert _escape_tmux_arg("a;b") == "a;b"
+    assert _escape_tmux_arg("ls;") == r"ls\;"
+    assert _escape_tmux_arg(";") == r"\;"
+
+
+@pytest.fixture
+def tmux_calls(monkeypatch):
+    calls = []
+
+    async def fake_run_tmux(*args, timeout=10):
+        calls.append(args)
+        return 0, "", ""
+
+    monkeypatch.setattr(tmux_bridge, "_run_tmux", fake_run_tmux)
+    return calls
+
+
+def test_send_keys_single_invocation(tmux_calls):
+    bridge = TmuxBridge("s:0")
+    asyncio.run(bridge.send_keys("echo hi;\n\n-l"))
+    t = ("-t", "s:0")
+    assert tmux_calls == [(
+        "send-keys", *t, "-l", "--", r"echo hi\;", ";",
+        "send-keys", *t, "C-j", ";",
+        "send-keys", *t, "C-j", ";",
+        "send-keys", *t, "-l", "--", "-l", ";",
+        "send-keys", *t, "C-j", ";",
+        "send-keys", *t, "Enter",
+    )]
+
+
+def test_send_keys_without_enter(tmux_calls):
+    bridge = TmuxBridge("s:0")
+    asyncio.run(bridge.send_keys("x", send_enter=False))
+    assert tmux_calls == [("send-keys", "-t", "s:0", "-l", "--", "x", ";", "send-keys", "-t", "s:0", "C-j")]
+
+
+def test_send_keys_nothing_to_send(tmux_calls):
+    asyncio.run(TmuxBridge("s:0").send_keys("", send_enter=False))
+    assert tmux_calls == []
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux not installed")
+def test_send_keys_delivers_literal_text(tmp_path, monkeypatch):
+    monkeypatch.setenv("TERM", "xterm")
+    session = f"devgram-test-{tmp_path.name}"
+    out = tmp_path / "out.txt"
+
+    async def main():
+        rc, _, err = await tmux_bridge._run_tmux(
+            "new-session", "-d", "-s", session, "-x", "80", "-y", "20", f"stty -echo; cat > {out}"
+        )
+        assert rc == 0, err
+        try:
+            await asyncio.sleep(0.3)
+            await TmuxBridge(f"{session}:0").send_keys("ends with;\n-l\n$HOME 'q'", send_enter=False)
+            await tmux_bridge._run_tmux("send-keys", "-t", f"{session}:0", "C-d")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and not out.read_text():
+                await asyncio.sleep(0.05)
+        finally:
+            await tmux_bridge._run_tmux("kill-session", "-t", session)
+
+    asyncio.run(main())
+    # Each line is followed by C-j, so the last one ends with a newline too
+    assert out.read_text() == "ends with;\n-l\n$HOME 'q'\n"
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux not installed")
+def test_close_control_clients_reaps_everything(tmp_path, monkeypatch):
+    monkeypatch.setenv("TERM", "xterm")
+    session = f"devgram-ctl-{tmp_path.name}"
+
+    async def main():
+        rc, _, err = await tmux_bridge._run_tmux("new-session", "-d", "-s", session, "-x", "80", "-y", "20")
+        assert rc == 0, err
+        try:
+            await TmuxBridge(f"{session}:0").capture()
+            client = tmux_bridge._CONTROL_CLIENTS[session]
+            assert client.alive
+            await tmux_bridge.close_control_clients()
+            assert tmux_bridge._CONTROL_CLIENTS == {}
+            assert client._reader.done() and client._proc.returncode is not None
+        finally:
+            await tmux_bridge._run_tmux("kill-session", "-t", session)
+
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+import random
+import re
+
+import pytest
+
+from bot.utils import CodeBlock, chunk_text, extract_code_block, redact_env_value
+
+_REFERENCE_RE = re.compile(r"```(\w+)?\n([\s\S]*?)```")
+
+
+def _extract_reference(text):
+    m = _REFERENCE_RE.search(text)
+    if not m:
+        return None
+    return CodeBlock(lang=(m.group(1) or "").strip().lower() or None, code=m.group(2))
+
+
+def test_extract_code_block_matches_regex():
+    rng = random.Random(0)
+    pieces = ["`", "```", "\n", "a", "P", "_", " ", "é", "-"]
+    for _ in range(50_000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 14)))
+        assert extract_code_block(text) == _extract_reference(text), repr(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("no fence", None),
+        ("```py\nprint(1)\n```", CodeBlock("py", "print(1)\n")),
+        ("```\nls\n```", CodeBlock(None, "ls\n")),
+        ("```Bash\nls\n```", CodeBlock("bash", "ls\n")),
+        ("```not a lang\nx\n```py\ny\n```", CodeBlock("py", "y\n")),
+        ("```py\nunterminated", None),
+    ],
+)
+def test_extract_code_block_cases(text, expected):
+    assert extract_code_block(text) == expected
+
+
+def test_chunk_text():
+    assert chunk_text("") == [""]
+    assert chunk_text("abc", limit=3) == ["abc"]
+    assert chunk_text("abcdefg", limit=3) == ["abc", "def", "g"]
+
+
+def test_redact_env_value():
+    assert redact_env_value("HOME", "/root") == "/root"
+    assert redact_env_value("API_KEY", "") == ""
+    assert redact_env_value("Password", "short") == "*****"
+    assert redact_env_value("GITHUB_TOKEN", "abcdefghijk") == "ab*******jk"